@@ -0,0 +1,71 @@
+import os
+import pickle
+import random
+import tempfile
+import zlib
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(router, checkpoint_file, attempt, best=None):
+    """Atomically write the routing state of router to checkpoint_file
+
+    attempt is the index of the next routing attempt to run and best is the
+    best solution tracked by route_all_nets, if any.
+    """
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'grid': (router.grid.width, router.grid.height),
+        'nets': [(net.name, net.route, net.cost) for net in router.nets],
+        'used_cells': {name: sorted(cells) for name, cells in router.grid.used_cells.items()},
+        'attempt': attempt,
+        'random_state': random.getstate(),
+        'fail_counts': dict(router.fail_counts),
+        'best': best,
+    }
+    data = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))
+
+    # Write to a temporary file next to the target, then rename it into place
+    # so a job killed mid-write never leaves a truncated checkpoint behind
+    directory = os.path.dirname(os.path.abspath(checkpoint_file))
+    fd, tmp_file = tempfile.mkstemp(dir=directory, prefix='.checkpoint-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, checkpoint_file)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+
+def load_checkpoint(router, checkpoint_file):
+    """Restore routing state from checkpoint_file into router
+
+    Returns the attempt index to continue from and the saved best solution.
+    """
+    with open(checkpoint_file, 'rb') as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {state.get('version')}")
+    if state['grid'] != (router.grid.width, router.grid.height):
+        raise ValueError(f"Checkpoint grid {state['grid']} does not match the design")
+    nets_by_name = {net.name: net for net in router.nets}
+    if set(nets_by_name) != {name for name, _, _ in state['nets']}:
+        raise ValueError("Checkpoint nets do not match the design")
+
+    for net in router.nets:
+        router.grid.clear_path(net.name)
+        net.clear_route()
+    for name, route, cost in state['nets']:
+        nets_by_name[name].route = route
+        nets_by_name[name].cost = cost
+    for name, cells in state['used_cells'].items():
+        router.grid.mark_path(cells, name)
+
+    router.fail_counts.clear()
+    router.fail_counts.update(state.get('fail_counts', {}))
+    random.setstate(state['random_state'])
+    return state['attempt'], state['best']
@@ -1,6 +1,16 @@
 import numpy as np
 from collections import defaultdict
 
+# Cost map entry for a move that leaves the grid or enters an obstacle
+BLOCKED = -1
+# Owner entry for a cell that no net has claimed
+FREE = -1
+
+# Moves indexed by direction: right, left, up, down
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# Direction order per layer, preferred direction first
+MOVE_ORDER = ((0, 1, 2, 3), (2, 3, 0, 1))
+
 class Grid:
     def __init__(self, width, height, bend_penalty, via_penalty, router):
         self.width = width
@@ -16,13 +26,159 @@ class Grid:
         # Track used cells for each net
         self.used_cells = defaultdict(set)
         
+        # Extra cost of entering each cell, set per region from the input
+        self.region_cost = np.zeros((2, height, width), dtype=int)
+        
+        # Net id owning each cell, either as a pin or as part of a route
+        self.net_ids = {}
+        self.pin_owner = np.full((2, height, width), FREE, dtype=int)
+        self.owner = np.full((2, height, width), FREE, dtype=int)
+        
+        # Cost of moving from a cell in each direction, and of a via from it
+        self.move_cost = np.full((2, len(DIRECTIONS), height, width), BLOCKED, dtype=int)
+        self.via_cost = np.full((2, height, width), BLOCKED, dtype=int)
+        self._update_cost_maps(0, 0, width - 1, height - 1)
+        
+        # Congestion estimate per tile: cells used by routed nets on both
+        # layers, plus the wiring expected inside the bounding boxes of
+        # unrouted nets
+        self.usage = np.zeros((height, width), dtype=int)
+        self.demand = np.zeros((height, width))
+        self.net_bboxes = {}
+        self._bbox_demand_nets = set()
+        
+    def _check_cell(self, layer, x, y):
+        """Raise ValueError unless (layer, x, y) is a cell of the grid"""
+        if not (layer in (0, 1) and 0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"Cell ({layer},{x},{y}) is outside the grid")
+
     def add_obstacle(self, layer, x, y):
         """Add obstacle to specified layer"""
+        self._check_cell(layer, x, y)
         if layer == 0:
             self.layer_m0[y, x] = 1
         else:
             self.layer_m1[y, x] = 1
+        self._update_cost_maps(x - 1, y - 1, x + 1, y + 1)
         print(f"Obstacle added at Layer={layer}, X={x}, Y={y}")
+
+    def remove_obstacle(self, layer, x, y):
+        """Remove obstacle from specified layer"""
+        self._check_cell(layer, x, y)
+        if layer == 0:
+            self.layer_m0[y, x] = 0
+        else:
+            self.layer_m1[y, x] = 0
+        self._update_cost_maps(x - 1, y - 1, x + 1, y + 1)
+        print(f"Obstacle removed at Layer={layer}, X={x}, Y={y}")
+
+    def set_region_cost(self, layer, x1, y1, x2, y2, cost):
+        """Set the extra cost of entering cells of a region on a layer"""
+        if cost < 0:
+            raise ValueError(f"Region cost must not be negative, got {cost}")
+        self._check_cell(layer, x1, y1)
+        self._check_cell(layer, x2, y2)
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        self.region_cost[layer, y1:y2 + 1, x1:x2 + 1] = cost
+        self._update_cost_maps(x1 - 1, y1 - 1, x2 + 1, y2 + 1)
+        print(f"Region cost {cost} set at Layer={layer}, X={x1}..{x2}, Y={y1}..{y2}")
+
+    def _update_cost_maps(self, x1, y1, x2, y2):
+        """Recompute move and via costs for source cells in a window"""
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(self.width - 1, x2), min(self.height - 1, y2)
+        if x1 > x2 or y1 > y2:
+            return
+        ys, xs = np.mgrid[y1:y2 + 1, x1:x2 + 1]
+        obstacles = (self.layer_m0, self.layer_m1)
+        
+        for layer in (0, 1):
+            for d, (dx, dy) in enumerate(DIRECTIONS):
+                next_x, next_y = xs + dx, ys + dy
+                inside = ((next_x >= 0) & (next_x < self.width) &
+                          (next_y >= 0) & (next_y < self.height))
+                next_x = next_x.clip(0, self.width - 1)
+                next_y = next_y.clip(0, self.height - 1)
+                
+                # Only add penalty for non-preferred direction movements
+                cost = 1
+                if (layer == 0 and dx == 0) or (layer == 1 and dx != 0):
+                    cost += self.bend_penalty
+                cost = cost + self.region_cost[layer, next_y, next_x]
+                open_cell = inside & (obstacles[layer][next_y, next_x] == 0)
+                self.move_cost[layer, d, y1:y2 + 1, x1:x2 + 1] = np.where(open_cell, cost, BLOCKED)
+            
+            # Via movements (layer changes) land on the other layer
+            other_layer = 1 - layer
+            cost = self.via_penalty + self.region_cost[other_layer, y1:y2 + 1, x1:x2 + 1]
+            open_cell = obstacles[other_layer][y1:y2 + 1, x1:x2 + 1] == 0
+            self.via_cost[layer, y1:y2 + 1, x1:x2 + 1] = np.where(open_cell, cost, BLOCKED)
+
+    def register_net(self, net):
+        """Assign an id to a net and reserve its pin cells"""
+        current_id = self.net_ids.get(net.name, FREE)
+        for pin in net.pins:
+            if self.pin_owner[pin.layer, pin.y, pin.x] not in (FREE, current_id):
+                raise ValueError(f"Pin ({pin.layer},{pin.x},{pin.y}) of net {net.name} "
+                                 f"is already a pin of another net")
+        net_id = self._net_id(net.name)
+        for pin in net.pins:
+            self.pin_owner[pin.layer, pin.y, pin.x] = net_id
+            if self.owner[pin.layer, pin.y, pin.x] == FREE:
+                self.owner[pin.layer, pin.y, pin.x] = net_id
+        if len(net.pins) >= 2:
+            self.net_bboxes[net.name] = (min(pin.x for pin in net.pins),
+                                         min(pin.y for pin in net.pins),
+                                         max(pin.x for pin in net.pins),
+                                         max(pin.y for pin in net.pins))
+            if net.name not in self.used_cells:
+                self._set_bbox_demand(net.name, True)
+
+    def unregister_net(self, net):
+        """Free the route and pin cells of a net"""
+        self.clear_path(net.name)
+        self._set_bbox_demand(net.name, False)
+        self.net_bboxes.pop(net.name, None)
+        net_id = self.net_ids.pop(net.name, None)
+        if net_id is None:
+            return
+        for pin in net.pins:
+            if self.pin_owner[pin.layer, pin.y, pin.x] == net_id:
+                self.pin_owner[pin.layer, pin.y, pin.x] = FREE
+            if self.owner[pin.layer, pin.y, pin.x] == net_id:
+                self.owner[pin.layer, pin.y, pin.x] = FREE
+
+    def _set_bbox_demand(self, net_name, enabled):
+        """Add or remove the expected wiring of a net over its bounding box"""
+        if net_name not in self.net_bboxes or enabled == (net_name in self._bbox_demand_nets):
+            return
+        min_x, min_y, max_x, max_y = self.net_bboxes[net_name]
+        box_width, box_height = max_x - min_x + 1, max_y - min_y + 1
+        # A minimal route crosses box_width + box_height - 1 of the box tiles
+        density = (box_width + box_height - 1) / (box_width * box_height)
+        if enabled:
+            self._bbox_demand_nets.add(net_name)
+        else:
+            self._bbox_demand_nets.discard(net_name)
+            density = -density
+        self.demand[min_y:max_y + 1, min_x:max_x + 1] += density
+
+    def region_congestion(self, min_x, min_y, max_x, max_y):
+        """Average estimated congestion of the tiles in a region"""
+        region = (slice(min_y, max_y + 1), slice(min_x, max_x + 1))
+        return float((self.usage[region] + self.demand[region]).mean())
+
+    def net_congestion(self, net_name):
+        """Average estimated congestion over the bounding box of a net"""
+        if net_name not in self.net_bboxes:
+            return 0.0
+        return self.region_congestion(*self.net_bboxes[net_name])
+
+    def _net_id(self, net_name):
+        if net_name not in self.net_ids:
+            self.net_ids[net_name] = max(self.net_ids.values(), default=-1) + 1
+        return self.net_ids[net_name]
             
     def is_valid_move(self, layer, x, y, net_name=None):
         """Check if a position is valid for routing"""
@@ -35,65 +191,90 @@ class Grid:
             return False
         if layer == 1 and self.layer_m1[y, x] == 1:
             return False
-            
-        pos = (layer, x, y)
-        
-        # Check if position is a pin location of another net
-        for other_net in self.router.nets:  # We'll need to pass router reference to Grid
-            if other_net.name != net_name:
-                for pin in other_net.pins:
-                    if (layer, x, y) == (pin.layer, pin.x, pin.y):
-                        return False
-        
-        # Check if cell is used by other nets
-        for other_net, cells in self.used_cells.items():
-            if other_net != net_name:
-                if pos in cells:
-                    return False
-            
-        return True
+        
+        # Check if cell is a pin of, or used by, another net
+        owner = self.owner.item(layer, y, x)
+        return owner == FREE or owner == self.net_ids.get(net_name, FREE)
         
     def get_neighbors(self, pos, prev_pos, net_name):
         """Get valid neighboring positions with costs"""
         layer, x, y = pos
+        net_id = self.net_ids.get(net_name, FREE)
+        move_cost = self.move_cost
+        owner = self.owner
         neighbors = []
         
-        # Prioritize preferred directions based on layer
-        if layer == 0:  # M0 prefers horizontal
-            moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]  # Horizontal first
-        else:  # M1 prefers vertical
-            moves = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Vertical first
-        
-        for dx, dy in moves:
+        # Costs include the non-preferred direction penalty and region costs,
+        # and are BLOCKED for moves off the grid or into obstacles
+        for d in MOVE_ORDER[layer]:
+            cost = move_cost.item(layer, d, y, x)
+            if cost == BLOCKED:
+                continue
+            dx, dy = DIRECTIONS[d]
             new_x, new_y = x + dx, y + dy
-            if self.is_valid_move(layer, new_x, new_y, net_name):
-                is_horizontal = dx != 0
-                cost = 1
-                
-                # Only add penalty for non-preferred direction movements
-                # Remove the direction change penalty completely
-                if ((layer == 0 and not is_horizontal) or 
-                    (layer == 1 and is_horizontal)):
-                    cost += self.bend_penalty
-                
+            cell_owner = owner.item(layer, new_y, new_x)
+            if cell_owner == FREE or cell_owner == net_id:
                 neighbors.append((layer, new_x, new_y, cost))
         
         # Via movements (layer changes)
+        cost = self.via_cost.item(layer, y, x)
+        if cost != BLOCKED:
+            other_layer = 1 - layer
+            cell_owner = owner.item(other_layer, y, x)
+            if cell_owner == FREE or cell_owner == net_id:
+                neighbors.append((other_layer, x, y, cost))
+        
+        return neighbors
+
+    def get_ripup_neighbors(self, pos, net_name):
+        """Get neighbors reachable if routes of other nets were ripped up
+
+        Like get_neighbors, but cells routed by other nets are allowed. Each
+        neighbor also carries the id of the net owning it, or FREE. Pins of
+        other nets stay blocked since they cannot be moved.
+        """
+        layer, x, y = pos
+        net_id = self.net_ids.get(net_name, FREE)
+        neighbors = []
+        
+        for d in MOVE_ORDER[layer]:
+            cost = self.move_cost.item(layer, d, y, x)
+            if cost == BLOCKED:
+                continue
+            dx, dy = DIRECTIONS[d]
+            new_x, new_y = x + dx, y + dy
+            if self.pin_owner.item(layer, new_y, new_x) in (FREE, net_id):
+                neighbors.append((layer, new_x, new_y, cost, self.owner.item(layer, new_y, new_x)))
+        
+        cost = self.via_cost.item(layer, y, x)
         other_layer = 1 - layer
-        if self.is_valid_move(other_layer, x, y, net_name):
-            neighbors.append((other_layer, x, y, self.via_penalty))
+        if cost != BLOCKED and self.pin_owner.item(other_layer, y, x) in (FREE, net_id):
+            neighbors.append((other_layer, x, y, cost, self.owner.item(other_layer, y, x)))
         
         return neighbors
     
     def mark_path(self, path, net_name):
         """Mark cells as used by a net"""
+        net_id = self._net_id(net_name)
+        cells = self.used_cells[net_name]
         for pos in path:
-            self.used_cells[net_name].add(pos)
+            layer, x, y = pos
+            self.owner[layer, y, x] = net_id
+            if pos not in cells:
+                cells.add(pos)
+                self.usage[y, x] += 1
+        # The net is routed, so its usage replaces its estimated demand
+        self._set_bbox_demand(net_name, False)
             
     def clear_path(self, net_name):
         """Clear the path of a specific net"""
         if net_name in self.used_cells:
+            for layer, x, y in self.used_cells[net_name]:
+                self.owner[layer, y, x] = self.pin_owner[layer, y, x]
+                self.usage[y, x] -= 1
             del self.used_cells[net_name]
+            self._set_bbox_demand(net_name, True)
+
 
 # import numpy as np
 # from collections import defaultdict
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+
+from grid import BLOCKED, DIRECTIONS, FREE, MOVE_ORDER
+
+
+def _shifted(values, dx, dy, fill):
+    """Move values by (dx, dy) cells within the last two axes"""
+    out = np.full_like(values, fill)
+    h, w = values.shape[-2:]
+    out[..., max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+        values[..., max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+    return out
+
+
+def lee_route(grid, sources, targets, net_name, window=None, deadline=None):
+    """Find path from any source to nearest target using a vectorized Lee wavefront
+
+    Costs follow Grid.get_neighbors. The whole wavefront is relaxed at once
+    with array shifts masked by obstacles and cell ownership, on both layers
+    and across vias, until no cell can still improve on the best target.
+    window=(min_x, min_y, max_x, max_y) limits the search to part of the grid.
+    No path is returned if the time.monotonic() deadline passes first.
+    """
+    min_x, min_y, max_x, max_y = window or (0, 0, grid.width - 1, grid.height - 1)
+    rows = slice(min_y, max_y + 1)
+    cols = slice(min_x, max_x + 1)
+
+    # Move and via costs out of each cell, with blocked moves costing inf
+    move_cost = grid.move_cost[:, :, rows, cols].astype(float)
+    move_cost[move_cost == BLOCKED] = np.inf
+    via_cost = grid.via_cost[:, rows, cols].astype(float)
+    via_cost[via_cost == BLOCKED] = np.inf
+    owner = grid.owner[:, rows, cols]
+    passable = (owner == FREE) | (owner == grid.net_ids.get(net_name, FREE))
+
+    def local(pos):
+        layer, x, y = pos
+        return layer, y - min_y, x - min_x
+
+    def inside(pos):
+        return min_x <= pos[1] <= max_x and min_y <= pos[2] <= max_y
+
+    dist = np.full(passable.shape, np.inf)
+    local_sources = {local(source) for source in sources if inside(source)}
+    for source in local_sources:
+        dist[source] = 0
+    targets = [target for target in targets if inside(target)]
+    if not targets or not np.isfinite(dist).any():
+        return None, float('inf')
+    target_index = tuple(np.array([local(target) for target in targets]).T)
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return None, float('inf')
+        new_dist = dist.copy()
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            arrival = _shifted(dist + move_cost[:, d], dx, dy, np.inf)
+            np.minimum(new_dist, np.where(passable, arrival, np.inf), out=new_dist)
+        arrival = (dist + via_cost)[::-1]
+        np.minimum(new_dist, np.where(passable, arrival, np.inf), out=new_dist)
+
+        improved = new_dist < dist
+        dist = new_dist
+        if not improved.any():
+            break
+        # Costs are non-negative, so once every improved cell is at least as
+        # expensive as the best target, no target can improve any more
+        if dist[improved].min() >= dist[target_index].min():
+            break
+
+    target_dist = dist[target_index]
+    if not np.isfinite(target_dist).any():
+        return None, float('inf')
+    best = min(range(len(targets)), key=lambda i: (target_dist[i], targets[i]))
+    path = _backtrace(dist, move_cost, via_cost, local_sources, local(targets[best]))
+    path = [(int(layer), int(x) + min_x, int(y) + min_y) for layer, y, x in path]
+    return path, int(target_dist[best])
+
+
+def _backtrace(dist, move_cost, via_cost, sources, current):
+    """Walk back from current to a source along cells whose costs add up"""
+    path = [current]
+    visited = {current}
+    h, w = dist.shape[1:]
+    while current not in sources:
+        layer, y, x = current
+        predecessors = []
+        for d in MOVE_ORDER[layer]:
+            dx, dy = DIRECTIONS[d]
+            prev_x, prev_y = x - dx, y - dy
+            if 0 <= prev_x < w and 0 <= prev_y < h:
+                predecessors.append(((layer, prev_y, prev_x), move_cost[layer, d, prev_y, prev_x]))
+        predecessors.append(((1 - layer, y, x), via_cost[1 - layer, y, x]))
+
+        for prev, cost in predecessors:
+            if prev not in visited and dist[prev] + cost == dist[current]:
+                break
+        else:
+            raise RuntimeError(f"Lee backtrace lost the wavefront at {current}")
+        current = prev
+        path.append(current)
+        visited.add(current)
+    return path[::-1]
@@ -1,35 +1,194 @@
-from router import MazeRouter
-from visualize import visualize_routing
-
-def main():
-    # Test files:
-    # case1_simple_2pin.txt
-    # case2_multipin.txt
-    # case3_obstacles.txt
-    # case4_layer_preference.txt
-    # case5_high_density.txt
-    # case6_penalties.txt
-    # case7_boundary.txt
-    # case8_complex.txt
-    # case_ripup_test.txt
-    input_file = 'test_cases/case3_obstacles.txt'
-    output_file = 'output.txt'  # Replace with the path for your output file
-
-    # Initialize MazeRouter with the input file
-    router = MazeRouter(input_file)
-    
-    # Try to route all nets
-    if router.route_all_nets(max_attempts= 100):
-        print("Routing successful!")
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from router import ENGINES, MazeRouter
+
+
+def expand_inputs(patterns):
+    """Expand input files and glob patterns into a list of unique files"""
+    input_files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            print(f"No input files match {pattern}", file=sys.stderr)
+        for input_file in matches:
+            if input_file not in input_files:
+                input_files.append(input_file)
+    return input_files
+
+
+def design_names(input_files):
+    """Give every input file a unique name for its output files"""
+    names = []
+    for input_file in input_files:
+        base = os.path.splitext(os.path.basename(input_file))[0]
+        name = base
+        suffix = 2
+        while name in names:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        names.append(name)
+    return names
+
+
+def route_design(job):
+    """Route a single design and return its summary entry
+
+    Runs in a worker process; the router's console output goes to a log file.
+    """
+    output_prefix = os.path.join(job['output_dir'], job['name'])
+    result = {
+        'input': job['input_file'],
+        'output': output_prefix + '_output.txt',
+        'log': output_prefix + '.log',
+        'status': 'error',
+        'routed_nets': 0,
+        'total_nets': 0,
+        'cost': None,
+        'runtime_s': None,
+        'seed': job['seed'],
+    }
+    start = time.perf_counter()
+    try:
+        with open(result['log'], 'w') as log, contextlib.redirect_stdout(log):
+            if job['seed'] is not None:
+                random.seed(job['seed'])
+            router = MazeRouter(job['input_file'], bend_penalty=job['bend_penalty'],
+                                via_penalty=job['via_penalty'], engine=job['engine'])
+            checkpoint_file = None
+            if job['checkpoint_every']:
+                checkpoint_file = output_prefix + '.ckpt'
+                if job['resume'] and os.path.exists(checkpoint_file):
+                    router.load_checkpoint(checkpoint_file)
+            success = router.route_all_nets(max_attempts=job['max_attempts'],
+                                            time_limit=job['time_limit'], anytime=True,
+                                            checkpoint_file=checkpoint_file,
+                                            checkpoint_every=job['checkpoint_every'] or 1)
+            router.write_output(result['output'])
+            router.write_status(output_prefix + '.status')
+
+        routed = [net for net in router.nets if router.net_status[net.name] == 'routed']
+        result['routed_nets'] = len(routed)
+        result['total_nets'] = len(router.nets)
+        result['cost'] = sum(net.cost for net in routed if net.route)
+        if success:
+            result['status'] = 'routed'
+        elif routed:
+            result['status'] = 'partial'
+        else:
+            result['status'] = 'failed'
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['runtime_s'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def print_result(result):
+    """Print a one-line summary of a routed design"""
+    line = (f"{result['input']}: {result['status']}, "
+            f"{result['routed_nets']}/{result['total_nets']} nets, "
+            f"cost {result['cost']}, {result['runtime_s']}s")
+    if 'error' in result:
+        line += f" ({result['error']})"
+    print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Route one or more maze router designs.")
+    parser.add_argument('inputs', nargs='+',
+                        help="input files or glob patterns, e.g. 'test_cases/*.txt'")
+    parser.add_argument('-o', '--output-dir', default='output',
+                        help="directory for routed outputs, logs and the summary (default: output)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help="number of designs routed concurrently (default: CPU count)")
+    parser.add_argument('--bend-penalty', type=int,
+                        help="override the bend penalty of every design")
+    parser.add_argument('--via-penalty', type=int,
+                        help="override the via penalty of every design")
+    parser.add_argument('--seed', type=int,
+                        help="random seed used for every design")
+    parser.add_argument('--engine', choices=ENGINES, default='astar',
+                        help="path search engine (default: astar)")
+    parser.add_argument('--max-attempts', type=int, default=100,
+                        help="maximum rip-up and reroute attempts (default: 100)")
+    parser.add_argument('--time-limit', type=float,
+                        help="wall-clock budget per design in seconds")
+    parser.add_argument('--checkpoint-every', type=int, default=0,
+                        help="write a checkpoint every N attempts (default: off)")
+    parser.add_argument('--resume', action='store_true',
+                        help="resume designs from their checkpoints when present")
+    parser.add_argument('--summary',
+                        help="path of the JSON summary (default: OUTPUT_DIR/summary.json)")
+    parser.add_argument('--visualize', action='store_true',
+                        help="plot each routed design after routing")
+    args = parser.parse_args(argv)
+    if args.checkpoint_every < 0:
+        parser.error("--checkpoint-every must not be negative")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    input_files = expand_inputs(args.inputs)
+    if not input_files:
+        print("No input files to route.", file=sys.stderr)
+        return 2
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [{
+        'input_file': input_file,
+        'name': name,
+        'output_dir': args.output_dir,
+        'bend_penalty': args.bend_penalty,
+        'via_penalty': args.via_penalty,
+        'seed': args.seed,
+        'engine': args.engine,
+        'max_attempts': args.max_attempts,
+        'time_limit': args.time_limit,
+        'checkpoint_every': args.checkpoint_every,
+        'resume': args.resume,
+    } for input_file, name in zip(input_files, design_names(input_files))]
+
+    start = time.perf_counter()
+    results = []
+    if args.jobs == 1 or len(jobs) == 1:
+        for job in jobs:
+            results.append(route_design(job))
+            print_result(results[-1])
     else:
-        print("Routing failed after maximum attempts.")
-    
-    # Write the output to the specified file
-    router.write_output(output_file)
-    print(f"Routing results written to {output_file}")
-    
-    # Visualize the routing results
-    visualize_routing(output_file, input_file)
-    
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [pool.submit(route_design, job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+                print_result(results[-1])
+    results.sort(key=lambda result: input_files.index(result['input']))
+
+    summary_file = args.summary or os.path.join(args.output_dir, 'summary.json')
+    with open(summary_file, 'w') as f:
+        json.dump({
+            'designs': results,
+            'routed': sum(result['status'] == 'routed' for result in results),
+            'total': len(results),
+            'runtime_s': round(time.perf_counter() - start, 3),
+        }, f, indent=2)
+    print(f"Summary written to {summary_file}")
+
+    if args.visualize:
+        # Imported here so batch runs do not pay for matplotlib
+        from visualize import visualize_routing
+        for result in results:
+            if result['status'] != 'error':
+                visualize_routing(result['output'], result['input'])
+
+    return 0 if all(result['status'] == 'routed' for result in results) else 1
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
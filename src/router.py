@@ -1,22 +1,57 @@
-from grid import Grid
+from checkpoint import save_checkpoint, load_checkpoint
+from grid import Grid, FREE
+from lee import lee_route
 from net import Net, Pin
 import heapq
 import random
+import time
 from collections import defaultdict
 
 
+# Path search engines: A*, the vectorized Lee wavefront, or a per-search choice
+ENGINES = ('astar', 'lee', 'auto')
+# With engine='auto', Lee is used for search windows of at least this many
+# cells per layer in which at most this fraction of cells is blocked. Smaller
+# or more obstructed windows are searched faster by A*, which stops early.
+LEE_MIN_WINDOW_CELLS = 400
+LEE_MAX_BLOCKED_FRACTION = 0.35
+# Searches check the routing deadline once per this many expanded cells
+DEADLINE_CHECK_INTERVAL = 1000
+
+
+def _deadline_passed(deadline):
+    """Check if a time.monotonic() deadline, or None for no deadline, has passed"""
+    return deadline is not None and time.monotonic() >= deadline
+
+
 class MazeRouter:
-   def __init__(self, input_file, grid=None):
+   def __init__(self, input_file, grid=None, bend_penalty=None, via_penalty=None, engine='astar'):
+       if engine not in ENGINES:
+           raise ValueError(f"Unknown routing engine: {engine}")
+       self.engine = engine
        self.grid = None
        self.nets = []
-       self.parse_input(input_file)
+       self.net_status = {}
+       self._resume_state = None
+       # Number of times each net failed to route, used to route it earlier,
+       # and the net whose failure last ripped up each net in this attempt
+       self.fail_counts = defaultdict(int)
+       self.ripped_by = {}
+       self.parse_input(input_file, bend_penalty, via_penalty)
       
-   def parse_input(self, input_file):
-       """Parse the input file and initialize grid and nets"""
+   def parse_input(self, input_file, bend_penalty=None, via_penalty=None):
+       """Parse the input file and initialize grid and nets
+
+       bend_penalty and via_penalty, when given, override the file values.
+       """
        print(f"Parsing input file: {input_file}")
        with open(input_file, 'r') as f:
            # Parse first line
-           width, height, bend_penalty, via_penalty = map(int, f.readline().strip().split(','))
+           width, height, file_bend_penalty, file_via_penalty = map(int, f.readline().strip().split(','))
+           if bend_penalty is None:
+               bend_penalty = file_bend_penalty
+           if via_penalty is None:
+               via_penalty = file_via_penalty
            self.grid = Grid(width, height, bend_penalty, via_penalty, self)
            print(f"Grid initialized: {width}x{height}, Bend Penalty: {bend_penalty}, Via Penalty: {via_penalty}")
           
@@ -28,6 +63,11 @@ class MazeRouter:
                    parts = line[4:].strip('()').split(',')
                    layer, x, y = map(int, parts)
                    self.grid.add_obstacle(layer, x, y)
+               elif line.startswith('COST'):
+                   # Parse region cost: COST (layer,x1,y1,x2,y2) cost
+                   region, cost = line[5:].rsplit(')', 1)
+                   layer, x1, y1, x2, y2 = map(int, region.strip(' (').split(','))
+                   self.grid.set_region_cost(layer, x1, y1, x2, y2, int(cost))
                elif line.startswith('net'):
                    # Parse net
                    name = line.split()[0]
@@ -37,43 +77,303 @@ class MazeRouter:
                        layer, x, y = map(int, part.strip(') ').split(','))
                        pins.append(Pin(layer, x, y))
                    self.nets.append(Net(name, pins))
+                   self.grid.register_net(self.nets[-1])
                    print(f"Net added: {name}, Pins={[(pin.layer, pin.x, pin.y) for pin in pins]}")
   
-   def route_all_nets(self, max_attempts=100):
-        """Route all nets with localized ripup and reroute on failure"""
-        for attempt in range(max_attempts):
+   def get_net(self, name):
+       """Return the net with the given name"""
+       for net in self.nets:
+           if net.name == name:
+               return net
+       raise ValueError(f"Unknown net: {name}")
+
+   def add_net(self, name, pins):
+       """Add a net given its pins as (layer, x, y) tuples, without routing it"""
+       if any(net.name == name for net in self.nets):
+           raise ValueError(f"Net {name} already exists")
+       for layer, x, y in pins:
+           if not (0 <= x < self.grid.width and 0 <= y < self.grid.height and layer in (0, 1)):
+               raise ValueError(f"Pin ({layer},{x},{y}) of net {name} is outside the grid")
+           if self.grid.pin_owner[layer, y, x] != FREE:
+               raise ValueError(f"Pin ({layer},{x},{y}) of net {name} is already a pin of another net")
+           if (self.grid.layer_m0 if layer == 0 else self.grid.layer_m1)[y, x] == 1:
+               raise ValueError(f"Pin ({layer},{x},{y}) of net {name} is on an obstacle")
+       net = Net(name, [Pin(layer, x, y) for layer, x, y in pins])
+       self.nets.append(net)
+       self.grid.register_net(net)
+       print(f"Net added: {name}, Pins={[(pin.layer, pin.x, pin.y) for pin in net.pins]}")
+       return net
+
+   def remove_net(self, name):
+       """Remove a net and free the cells its route used"""
+       net = self.get_net(name)
+       self.grid.unregister_net(net)
+       self.nets.remove(net)
+       self.net_status.pop(name, None)
+       print(f"Net removed: {name}")
+
+   def reroute_net(self, name):
+       """Rip up and reroute a single net"""
+       net = self.get_net(name)
+       self.grid.clear_path(name)
+       net.clear_route()
+       return self.route_net(net)
+
+   def nets_using(self, cells, exclude=None):
+       """Return the routed nets whose routes pass through any of the (layer, x, y) cells"""
+       cells = set(cells)
+       return [net for net in self.nets
+               if net.name != exclude and net.route and not cells.isdisjoint(net.route)]
+
+   def route_all_nets(self, max_attempts=100, time_limit=None, anytime=False,
+                      checkpoint_file=None, checkpoint_every=1):
+        """Route all nets with localized ripup and reroute on failure
+
+        time_limit is a wall-clock budget in seconds. With anytime=True the
+        best solution seen across attempts (most routed nets, then lowest
+        total cost) is restored when routing stops without full success.
+        With checkpoint_file set, the routing state is saved there every
+        checkpoint_every attempts; see load_checkpoint to resume a run.
+        """
+        if checkpoint_every < 1:
+            raise ValueError(f"checkpoint_every must be at least 1, got {checkpoint_every}")
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        start_attempt, best = 0, None
+        if self._resume_state is not None:
+            start_attempt, best = self._resume_state
+            self._resume_state = None
+            print(f"Resuming from routing attempt {start_attempt + 1}")
+        
+        for attempt in range(start_attempt, max_attempts):
+            if _deadline_passed(deadline):
+                print(f"Time limit of {time_limit}s reached before attempt {attempt + 1}")
+                break
             print(f"\nRouting attempt {attempt + 1}/{max_attempts}")
             
             # Start with fresh routing for first attempt
             if attempt == 0:
+                self.fail_counts.clear()
                 for net in self.nets:
                     net.clear_route()
                     self.grid.clear_path(net.name)
+            self.ripped_by.clear()
             
-            # Try to route all unrouted nets
+            # Try to route all unrouted nets, hardest first; the shuffle
+            # only breaks ties between equally hard nets. Later attempts
+            # keep a random order so that a failing order is not repeated
             nets_to_route = [net for net in self.nets if not net.route]
             random.shuffle(nets_to_route)
+            if attempt == 0:
+                nets_to_route.sort(key=self._routing_difficulty, reverse=True)
+            else:
+                nets_to_route.sort(key=self._routing_priority, reverse=True)
             
             success = True
-            for net in nets_to_route:
+            # Rip-ups that let a failed net route within the same attempt,
+            # bounded so that nets cannot displace each other forever
+            rip_ups_left = len(self.nets)
+            while nets_to_route:
+                net = nets_to_route.pop(0)
+                if _deadline_passed(deadline):
+                    print(f"Time limit of {time_limit}s reached during attempt {attempt + 1}")
+                    success = False
+                    break
                 print(f"Routing net: {net.name}")
-                if not self.route_net(net):
-                    print(f"Failed to route net: {net.name}")
+                if self.route_net(net, deadline):
+                    print(f"Net {net.name} routed successfully.")
+                    continue
+                if _deadline_passed(deadline):
+                    # The search was cut short, which says nothing about the net
+                    nets_to_route.insert(0, net)
+                    continue
+                print(f"Failed to route net: {net.name}")
+                self.fail_counts[net.name] += 1
+                # Remember the state before ripping anything up
+                best = self._keep_best_solution(best)
+                victims = self._select_victims(net, deadline)
+                if _deadline_passed(deadline):
+                    nets_to_route.insert(0, net)
+                    continue
+                # Two nets taking turns to rip each other up will never
+                # settle, so clear the whole area around them instead
+                if (victims and rip_ups_left > 0 and
+                        self.ripped_by.get(net.name) not in {victim.name for victim in victims}):
+                    rip_ups_left -= 1
+                    for victim in victims:
+                        print(f"Clearing net {victim.name} to make room for {net.name}")
+                        self.grid.clear_path(victim.name)
+                        victim.clear_route()
+                        self.ripped_by[victim.name] = net.name
+                    # Route the net into the space just freed, then its victims
+                    if self.route_net(net, deadline):
+                        print(f"Net {net.name} routed successfully.")
+                        victims.sort(key=self._routing_difficulty, reverse=True)
+                        nets_to_route[:0] = victims
+                        continue
+                else:
                     # Get the bounding box of the failed route attempt
                     bbox = self._get_routing_bbox(net.pins)
                     # Clear all routes in the congestion box
                     self._clear_routes_in_bbox(bbox)
-                    success = False
-                    break
-                print(f"Net {net.name} routed successfully.")
+                # Leave the net to the next attempt and route the rest
+                success = False
             
             if success:
                 print("All nets routed successfully!")
+                self._update_net_status()
                 return True
+            best = self._keep_best_solution(best)
+            if checkpoint_file and (attempt + 1) % checkpoint_every == 0:
+                save_checkpoint(self, checkpoint_file, attempt + 1, best)
+                print(f"Checkpoint written to {checkpoint_file}")
+            if _deadline_passed(deadline):
+                break
         
+        if anytime and best is not None:
+            print(f"Restoring best solution: {best[0][0]}/{len(self.nets)} nets routed, "
+                  f"Total Cost: {-best[0][1]}")
+            self._restore_solution(best[1])
+        self._update_net_status()
         print("Routing failed after maximum attempts.")
         return False
 
+   def load_checkpoint(self, checkpoint_file):
+        """Restore routing state from a checkpoint
+
+        The next call to route_all_nets continues from the saved attempt.
+        """
+        print(f"Loading checkpoint: {checkpoint_file}")
+        self._resume_state = load_checkpoint(self, checkpoint_file)
+
+   def _keep_best_solution(self, best):
+        """Return the better of best and the current solution
+
+        Solutions are ranked by routed-net count, then by lowest total cost.
+        """
+        routed = [net for net in self.nets if net.route]
+        score = (len(routed), -sum(net.cost for net in routed))
+        if best is None or score > best[0]:
+            return (score, {net.name: (list(net.route), net.cost) for net in routed})
+        return best
+
+   def _restore_solution(self, solution):
+        """Replace all current routes with a saved solution"""
+        for net in self.nets:
+            self.grid.clear_path(net.name)
+            net.clear_route()
+        for net in self.nets:
+            if net.name in solution:
+                net.route, net.cost = solution[net.name]
+                self.grid.mark_path(net.route, net.name)
+
+   def _update_net_status(self):
+        """Record and report whether each net ended up routed"""
+        self.net_status = {}
+        for net in self.nets:
+            if net.route or len(net.pins) < 2:
+                self.net_status[net.name] = 'routed'
+            else:
+                self.net_status[net.name] = 'unrouted'
+            print(f"Net {net.name}: {self.net_status[net.name]}")
+
+   def _routing_difficulty(self, net):
+        """Rank a net by past failures, then by congestion around its pins"""
+        return (self.fail_counts[net.name], self.grid.net_congestion(net.name))
+
+   def _routing_priority(self, net):
+        """Random sort key that tends to put hard nets first
+
+        Keys are drawn as u ** (1 / weight) for uniform u, so a net goes
+        first with a chance proportional to its weight. The weight grows
+        with past failures and with the congestion around the net.
+        """
+        weight = (1 + self.fail_counts[net.name]) * (1 + self.grid.net_congestion(net.name))
+        return random.random() ** (1 / weight)
+
+   def _select_victims(self, net, deadline=None):
+        """Choose the fewest, cheapest routed nets to rip up so that net fits
+
+        The net is routed as in route_net, but cells of other routes may be
+        crossed at a penalty for each net entered. The penalty is larger
+        than the cost of ripping up every other net, so fewer victims always
+        win. Among equally many, the cheapest to reroute win: route cost
+        scaled by the congestion around the net. Returns None if no rip-up
+        can make room for net, or if the search runs past deadline.
+        """
+        rip_costs = {}
+        for other in self.nets:
+            if other.route and other.name != net.name:
+                other_id = self.grid.net_ids[other.name]
+                rip_costs[other_id] = other.cost * (1 + self.grid.net_congestion(other.name))
+        victim_penalty = sum(rip_costs.values()) + 1
+        
+        source_positions = {(net.pins[0].layer, net.pins[0].x, net.pins[0].y)}
+        target_positions = {(pin.layer, pin.x, pin.y) for pin in net.pins[1:]}
+        victim_ids = set()
+        while target_positions:
+            path = self._route_through_nets(source_positions, target_positions, net.name,
+                                            rip_costs, victim_penalty, victim_ids, deadline)
+            if not path:
+                return None
+            for layer, x, y in path:
+                owner = self.grid.owner[layer, y, x]
+                if owner in rip_costs:
+                    victim_ids.add(owner)
+            source_positions.update(path)
+            target_positions.difference_update(path)
+        
+        return [other for other in self.nets
+                if self.grid.net_ids.get(other.name) in victim_ids and other.route]
+
+   def _route_through_nets(self, sources, targets, net_name, rip_costs, victim_penalty, victim_ids,
+                           deadline=None):
+        """Find path to nearest target that may cross the routes of other nets
+
+        Costs are compared as (rip-up cost, path cost) pairs, with
+        cost_lower_bound added to the path cost as heuristic. The first time
+        a path enters the route of a net not in victim_ids, it pays
+        victim_penalty plus the rip cost of that net. Search states are
+        (position, nets entered so far), so a path that leaves a route and
+        enters it again does not pay for it twice.
+        """
+        entered = tuple(sorted(victim_ids))
+        open_set = []
+        for source in sources:
+            min_dist = min(self.cost_lower_bound(source, target) for target in targets)
+            heapq.heappush(open_set, ((0, min_dist), source, entered))
+        
+        came_from = {(source, entered): None for source in sources}
+        g_score = {(source, entered): (0, 0) for source in sources}
+        
+        expanded = 0
+        while open_set:
+            expanded += 1
+            if expanded % DEADLINE_CHECK_INTERVAL == 0 and _deadline_passed(deadline):
+                return None
+            _, current, entered = heapq.heappop(open_set)
+            state = (current, entered)
+            if current in targets:
+                return [pos for pos, _ in self.reconstruct_path(came_from, state)]
+            
+            rip_cost, path_cost = g_score[state]
+            for layer, next_x, next_y, cost, owner in self.grid.get_ripup_neighbors(current, net_name):
+                next_rip_cost, next_entered = rip_cost, entered
+                if owner in rip_costs and owner not in entered:
+                    next_rip_cost += victim_penalty + rip_costs[owner]
+                    next_entered = tuple(sorted(entered + (owner,)))
+                tentative_g = (next_rip_cost, path_cost + cost)
+                
+                next_pos = (layer, next_x, next_y)
+                next_state = (next_pos, next_entered)
+                if next_state not in g_score or tentative_g < g_score[next_state]:
+                    came_from[next_state] = state
+                    g_score[next_state] = tentative_g
+                    min_dist = min(self.cost_lower_bound(next_pos, target) for target in targets)
+                    heapq.heappush(open_set, ((next_rip_cost, path_cost + cost + min_dist),
+                                              next_pos, next_entered))
+        
+        return None
+
    def _get_routing_bbox(self, pins, padding=2):
         """Calculate bounding box around pins with padding"""
         min_x = min(pin.x for pin in pins)
@@ -108,8 +408,11 @@ class MazeRouter:
             self.grid.clear_path(net.name)
             net.clear_route()
     
-   def route_net(self, net):
-       """Route a multi-pin net using Steiner tree approach"""
+   def route_net(self, net, deadline=None):
+       """Route a multi-pin net using Steiner tree approach
+
+       Fails without routing the net if deadline (time.monotonic()) passes.
+       """
        if len(net.pins) < 2:
            print(f"Net {net.name} has less than 2 pins, skipping.")
            return True
@@ -120,7 +423,7 @@ class MazeRouter:
        total_cost = 0
       
        while target_positions:
-           path, cost = self.route_to_nearest_target(source_positions, target_positions, net.name)
+           path, cost = self.find_path(source_positions, target_positions, net.name, deadline)
            if not path:
                print(f"Failed to find path for net: {net.name}")
                return False
@@ -145,19 +448,56 @@ class MazeRouter:
        print(f"Net {net.name} routed. Path: {complete_path}, Total Cost: {total_cost}")
        return True
   
-   def route_to_nearest_target(self, sources, targets, net_name):
-       """Find path from any source to nearest target using modified A*"""
+   def find_path(self, sources, targets, net_name, deadline=None):
+       """Find path from any source to nearest target with the selected engine"""
+       if self.engine == 'lee':
+           return lee_route(self.grid, sources, targets, net_name, deadline=deadline)
+       if self.engine == 'auto':
+           window = self._get_search_window(sources | targets)
+           if self._prefers_lee(window, net_name):
+               path, cost = lee_route(self.grid, sources, targets, net_name, window, deadline)
+               if path or _deadline_passed(deadline):
+                   return path, cost
+               # The window may be too tight; fall back to a full-grid search
+       return self.route_to_nearest_target(sources, targets, net_name, deadline)
+
+   def _get_search_window(self, positions, padding=2):
+       """Calculate bounding box around (layer, x, y) positions with padding"""
+       return self._get_routing_bbox([Pin(*pos) for pos in positions], padding)
+
+   def _prefers_lee(self, window, net_name):
+       """Check if the Lee engine is expected to search a window faster than A*"""
+       min_x, min_y, max_x, max_y = window
+       if (max_x - min_x + 1) * (max_y - min_y + 1) < LEE_MIN_WINDOW_CELLS:
+           return False
+       rows = slice(min_y, max_y + 1)
+       cols = slice(min_x, max_x + 1)
+       owner = self.grid.owner[:, rows, cols]
+       blocked = (owner != FREE) & (owner != self.grid.net_ids.get(net_name, FREE))
+       blocked[0] |= self.grid.layer_m0[rows, cols] == 1
+       blocked[1] |= self.grid.layer_m1[rows, cols] == 1
+       return blocked.mean() <= LEE_MAX_BLOCKED_FRACTION
+
+   def route_to_nearest_target(self, sources, targets, net_name, deadline=None):
+       """Find path from any source to nearest target using modified A*
+
+       Gives up, returning no path, once deadline (time.monotonic()) passes.
+       """
        open_set = []
        for source in sources:
-           # Calculate minimum Manhattan distance to any target
-           min_dist = min(self.manhattan_distance(source, target) for target in targets)
-           heapq.heappush(open_set, (min_dist, source))
+           # Calculate minimum cost estimate to any target
+           min_dist = min(self.cost_lower_bound(source, target) for target in targets)
+           heapq.heappush(open_set, (min_dist, min_dist, source))
       
        came_from = {source: None for source in sources}
        g_score = {source: 0 for source in sources}
       
+       expanded = 0
        while open_set:
-           current = heapq.heappop(open_set)[1]
+           expanded += 1
+           if expanded % DEADLINE_CHECK_INTERVAL == 0 and _deadline_passed(deadline):
+               return None, float('inf')
+           current = heapq.heappop(open_set)[2]
           
            # Check if we've reached any target
            if current in targets:
@@ -171,11 +511,12 @@ class MazeRouter:
                if (layer, next_x, next_y) not in g_score or tentative_g < g_score[(layer, next_x, next_y)]:
                    came_from[(layer, next_x, next_y)] = current
                    g_score[(layer, next_x, next_y)] = tentative_g
-                   # Use minimum distance to any remaining target as heuristic
-                   min_dist = min(self.manhattan_distance((layer, next_x, next_y), target)
+                   # Use minimum cost estimate to any remaining target as heuristic
+                   min_dist = min(self.cost_lower_bound((layer, next_x, next_y), target)
                                for target in targets)
                    f_score = tentative_g + min_dist
-                   heapq.heappush(open_set, (f_score, (layer, next_x, next_y)))
+                   # Among equal f scores, expand cells closer to a target first
+                   heapq.heappush(open_set, (f_score, min_dist, (layer, next_x, next_y)))
       
        return None, float('inf')
 
@@ -184,6 +525,23 @@ class MazeRouter:
    def manhattan_distance(self, pos1, pos2):
        """Calculate Manhattan distance between two positions"""
        return abs(pos1[1] - pos2[1]) + abs(pos1[2] - pos2[2])
+
+   def cost_lower_bound(self, pos1, pos2):
+       """Estimate the cost between two positions without overestimating it
+
+       On top of the Manhattan distance, a path must change layer with a via
+       or, staying on one layer, pay the bend penalty on every move against
+       the preferred direction. Avoiding the bend penalties by switching
+       layers takes two vias.
+       """
+       distance = self.manhattan_distance(pos1, pos2)
+       if pos1[0] != pos2[0]:
+           return distance + self.grid.via_penalty
+       if pos1[0] == 0:
+           against = abs(pos1[2] - pos2[2])
+       else:
+           against = abs(pos1[1] - pos2[1])
+       return distance + min(self.grid.bend_penalty * against, 2 * self.grid.via_penalty)
   
    def reconstruct_path(self, came_from, current):
        """Reconstruct path from came_from dictionary"""
@@ -193,6 +551,14 @@ class MazeRouter:
            current = came_from[current]
        return path[::-1]
   
+   def write_status(self, status_file):
+       """Write the per-net routing status to a file"""
+       with open(status_file, 'w') as f:
+           for net in self.nets:
+               status = self.net_status.get(net.name, 'unrouted')
+               cost = net.cost if net.route else '-'
+               f.write(f"{net.name} {status} {cost}\n")
+
    def write_output(self, output_file):
        """Write routing results to output file"""
        print(f"Writing output to {output_file}")
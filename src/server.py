@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from router import MazeRouter
+
+# Router of the design loaded in this worker process
+_router = None
+
+
+def _load_design(request):
+    """Worker entry point: parse the design once and keep it loaded
+
+    Runs as the first task of the worker rather than as its initializer, so
+    parse errors are returned to the client like any other request error.
+    """
+    global _router
+    # The router reports progress on stdout; keep the server console quiet
+    sys.stdout = open(os.devnull, 'w')
+    if request.get('seed') is not None:
+        random.seed(request['seed'])
+    _router = MazeRouter(request['input_file'], bend_penalty=request.get('bend_penalty'),
+                         via_penalty=request.get('via_penalty'),
+                         engine=request.get('engine', 'astar'))
+    return _op_info(request)
+
+
+def _net_info(net):
+    return {
+        'route': [list(pos) for pos in net.route],
+        'cost': net.cost if net.route else None,
+        'status': 'routed' if net.route or len(net.pins) < 2 else 'unrouted',
+    }
+
+
+def _reroute(nets):
+    """Reroute the given nets and return the names of those that failed"""
+    failed = []
+    for net in nets:
+        net.clear_route()
+        _router.grid.clear_path(net.name)
+    for net in nets:
+        if not _router.route_net(net):
+            failed.append(net.name)
+    return failed
+
+
+def _op_info(request):
+    return {
+        'width': _router.grid.width,
+        'height': _router.grid.height,
+        'bend_penalty': _router.grid.bend_penalty,
+        'via_penalty': _router.grid.via_penalty,
+        'engine': _router.engine,
+        'nets': [net.name for net in _router.nets],
+    }
+
+
+def _op_route_all(request):
+    success = _router.route_all_nets(max_attempts=request.get('max_attempts', 100),
+                                     time_limit=request.get('time_limit'), anytime=True)
+    return {'success': success, 'net_status': _router.net_status}
+
+
+def _op_query(request):
+    names = request.get('nets') or [net.name for net in _router.nets]
+    return {name: _net_info(_router.get_net(name)) for name in names}
+
+
+def _op_add_net(request):
+    name = request['net']
+    pins = [tuple(pin) for pin in request['pins']]
+    net = _router.add_net(name, pins)
+    # Routes of other nets may already pass through the new pins
+    displaced = _router.nets_using(pins, exclude=name)
+    for other in displaced:
+        _router.grid.clear_path(other.name)
+        other.clear_route()
+    routed = _router.route_net(net)
+    return {
+        'routed': routed,
+        'displaced': [other.name for other in displaced],
+        'failed': _reroute(displaced),
+        'net': _net_info(net),
+    }
+
+
+def _op_remove_net(request):
+    _router.remove_net(request['net'])
+    return {'removed': request['net']}
+
+
+def _op_reroute_net(request):
+    routed = _router.reroute_net(request['net'])
+    return {'routed': routed, 'net': _net_info(_router.get_net(request['net']))}
+
+
+def _op_add_obstacle(request):
+    layer, x, y = request['layer'], request['x'], request['y']
+    _router.grid.add_obstacle(layer, x, y)
+    broken = _router.nets_using([(layer, x, y)])
+    failed = _reroute(broken) if request.get('reroute', True) else []
+    return {'broken': [net.name for net in broken], 'failed': failed}
+
+
+def _op_remove_obstacle(request):
+    _router.grid.remove_obstacle(request['layer'], request['x'], request['y'])
+    return {}
+
+
+DESIGN_OPS = {
+    'info': _op_info,
+    'route_all': _op_route_all,
+    'query': _op_query,
+    'add_net': _op_add_net,
+    'remove_net': _op_remove_net,
+    'reroute_net': _op_reroute_net,
+    'add_obstacle': _op_add_obstacle,
+    'remove_obstacle': _op_remove_obstacle,
+}
+
+
+def _run_design_op(op, request):
+    """Worker entry point: apply a request to the loaded design"""
+    return DESIGN_OPS[op](request)
+
+
+class RoutingServer:
+    """Serve JSON routing requests against designs kept loaded in memory
+
+    Each design lives in its own single-worker process, so requests for
+    different designs run in parallel while requests for the same design
+    are applied one at a time, in order.
+    """
+
+    def __init__(self):
+        self.designs = {}
+
+    async def handle_request(self, request):
+        op = request.get('op')
+        if op == 'load':
+            return await self.load_design(request)
+        if op == 'unload':
+            self.unload_design(request['design'])
+            return {'unloaded': request['design']}
+        if op == 'list':
+            return {'designs': sorted(self.designs)}
+        if op not in DESIGN_OPS:
+            raise ValueError(f"Unknown op: {op}")
+        design = request.get('design')
+        if design not in self.designs:
+            raise ValueError(f"Design {design} is not loaded")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.designs[design], _run_design_op, op, request)
+
+    async def load_design(self, request):
+        design = request['design']
+        if design in self.designs:
+            self.unload_design(design)
+        executor = ProcessPoolExecutor(max_workers=1)
+        self.designs[design] = executor
+        try:
+            # Parse the design now rather than on the first real request
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, _load_design, request)
+        except Exception:
+            self.unload_design(design)
+            raise
+
+    def unload_design(self, design):
+        executor = self.designs.pop(design, None)
+        if executor is None:
+            raise ValueError(f"Design {design} is not loaded")
+        executor.shutdown(wait=False)
+
+    def close(self):
+        for design in list(self.designs):
+            self.unload_design(design)
+
+    async def serve_request(self, line, writer, write_lock):
+        start = time.perf_counter()
+        request = {}
+        try:
+            request = json.loads(line)
+            response = {'ok': True, 'result': await self.handle_request(request)}
+        except Exception as e:
+            response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        if isinstance(request, dict) and 'id' in request:
+            response['id'] = request['id']
+        response['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        """Read newline-delimited JSON requests and answer each as it completes"""
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.serve_request(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    server = RoutingServer()
+    if args.socket:
+        listener = await asyncio.start_unix_server(server.handle_client, path=args.socket)
+        print(f"Routing server listening on {args.socket}")
+    else:
+        listener = await asyncio.start_server(server.handle_client, args.host, args.port)
+        print(f"Routing server listening on {args.host}:{args.port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve routing requests over a local socket.")
+    parser.add_argument('--socket', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port (default: 8765)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Regression checks for the router: python -m pytest src"""
+import contextlib
+import glob
+import io
+import os
+
+from lee import lee_route
+from router import MazeRouter
+
+TEST_CASES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'test_cases', '*.txt')))
+
+
+def load_router(input_file):
+    """Load a design without the parsing output"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return MazeRouter(input_file)
+
+
+def load_design(tmp_path, lines):
+    """Write a design to a file and load it"""
+    input_file = tmp_path / 'design.txt'
+    input_file.write_text('\n'.join(lines) + '\n')
+    return load_router(str(input_file))
+
+
+def set_route(router, name, route, cost):
+    net = router.get_net(name)
+    net.route, net.cost = route, cost
+    router.grid.mark_path(route, name)
+
+
+def test_victim_entered_twice_is_ripped_once(tmp_path):
+    # netN can only use rows 0 to 2 of M0, so it must cross columns x=2 and
+    # x=4. netA owns column x=2 and the top of x=4, netB the bottom of x=4
+    lines = ['7,5,0,1']
+    lines += [f'OBS (1,{x},{y})' for x in range(7) for y in range(5)]
+    lines += [f'OBS (0,{x},3)' for x in range(7)]
+    lines += ['netN (0,0,1) (0,6,1)', 'netA (0,0,4) (0,1,4)', 'netB (0,5,4) (0,6,4)']
+    router = load_design(tmp_path, lines)
+    set_route(router, 'netA', [(0, 2, 0), (0, 2, 1), (0, 2, 2), (0, 4, 0), (0, 4, 1)], 100)
+    set_route(router, 'netB', [(0, 4, 2)], 1)
+
+    netN = router.get_net('netN')
+    with contextlib.redirect_stdout(io.StringIO()):
+        victims = router._select_victims(netN)
+        assert [victim.name for victim in victims] == ['netA']
+        router.grid.clear_path('netA')
+        router.get_net('netA').clear_route()
+        assert router.route_net(netN)
+
+
+def test_lee_matches_astar_costs(tmp_path):
+    # Both engines read the same cost maps, so their best paths cost the same
+    region_design = load_design(tmp_path, ['10,10,5,3', 'COST (0,3,0,3,9) 50',
+                                           'COST (1,0,2,9,3) 4', 'OBS (1,5,5)',
+                                           'net1 (0,0,5) (0,9,5) (1,4,0)'])
+    for router in [region_design] + [load_router(input_file) for input_file in TEST_CASES]:
+        for net in router.nets:
+            sources = {(net.pins[0].layer, net.pins[0].x, net.pins[0].y)}
+            targets = {(pin.layer, pin.x, pin.y) for pin in net.pins[1:]}
+            _, astar_cost = router.route_to_nearest_target(sources, targets, net.name)
+            _, lee_cost = lee_route(router.grid, sources, targets, net.name)
+            assert lee_cost == astar_cost, net.name